@@ -4,23 +4,196 @@ Surveillance des séances Pathé pour le cinéma Brumath.
 Détecte la disponibilité et envoie un email uniquement lors de la transition indisponible -> disponible.
 """
 
+import argparse
+import asyncio
+import hashlib
 import os
 import json
 import re
-import smtplib
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError  # type: ignore
+from email.utils import parsedate_to_datetime
+from typing import Any
+from urllib.parse import urlsplit
+import httpx
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # stdlib json en fallback
+    orjson = None
+
+try:
+    import re2  # type: ignore
+except ImportError:  # module re de la stdlib en fallback
+    re2 = None
 
 # --- Constantes ---
 FILM_NAME = "Avatar : de feu et de cendres"
 FILM_URL = "https://www.pathe.fr/films/avatar-de-feu-et-de-cendres-11387"
+FILM_KEYWORD = "Avatar"
 CINEMA_KEYWORD = "Brumath"
 CINEMA_URL = "https://www.pathe.fr/cinemas/cinema-pathe-brumath"
+FILM_ID = FILM_URL.rsplit("-", 1)[-1]
+FILM_SLUG = FILM_URL.rsplit("/", 1)[-1]
+# Clés JSON (en minuscules) sous lesquelles l'API range les séances d'un film
+SHOWTIME_KEYS = {
+    "showtimes", "shows", "sessions", "seances", "séances", "horaires",
+    "hours", "times", "time", "starttime", "startsat", "startat",
+}
+# Clés JSON (en minuscules) qui identifient un film: une autre valeur = un autre film
+FILM_REF_KEYS = {"filmid", "film_id", "movieid", "movie_id", "slug"}
+# Endpoint JSON des séances (trouvé avec --discover); vide = scraping des pages
+API_URL = os.environ.get("PATHE_API_URL", "")
+# Stratégie par défaut de --mode (voir STRATEGIES)
+STRATEGY = os.environ.get("PATHE_STRATEGY", "auto")
+# Fragments d'URL des XHR susceptibles de porter les séances (--discover)
+XHR_URL_KEYWORDS = ("api", "show", "seance", "schedule")
+XHR_TIMEOUT = 15  # secondes d'attente max de la réponse JSON des séances (--mode xhr)
 STATE_FILE = "state.json"
+# Version des règles de détection: à incrémenter quand elles changent, pour que les
+# verdicts mémorisés dans state.json (http_cache) ne soient plus réutilisés
+ANALYSIS_VERSION = 3
+# Titre d'un film sur la page cinéma (h3 > span, à ajuster si Pathé change son DOM);
+# le bloc du film est le plus grand ancêtre du titre qui ne contient qu'un seul h3
+FILM_TITLE_SELECTOR = "h3 span"
+# Sonde courte: si le titre n'est pas là après le chargement, on passe au scan de la page
+FILM_TITLE_PROBE_TIMEOUT = 5000  # ms
+# Attente max de la réponse XHR des séances après un clic sur un jour
+DAY_CLICK_RESPONSE_TIMEOUT = 5000  # ms
+
+# --- Regex (compilées une seule fois) ---
+# Scans des pages entières: moteur DFA (RE2, temps linéaire) si google-re2 est installé
+_scan_re = re2 if re2 is not None else re
+# HH:MM sans alternance sur l'heure (24:00-29:59 écartés par is_horaire()); les \b évitent
+# de lire 20:30 dans "120:30" ou 20:10 dans "1920:1080"
+_HORAIRE_RE = _scan_re.compile(r"\b[012]\d:[0-5]\d\b")
+_RESERVATION_HORAIRE_RE = _scan_re.compile(
+    r"(?i)(?P<r>réserver|reserver|e-billet|billetterie)|(?P<h>\b[012]\d:[0-5]\d\b)"
+)
+# Film cherché dans le HTML brut (non normalisé): insensible à la casse directement dans la regex,
+# espaces du titre = blanc, espace insécable ou &nbsp; ("Titre\u00a0: ...")
+# + mots-clés de secours (pour le test actuel avec Avatar), en une seule alternance
+_FALLBACK_KEYS = ("avatar", "feu", "cendres")
+_FILM_HTML_RE = _scan_re.compile(
+    "(?i)"
+    + "|".join(
+        "(?:\\s|\u00a0|&nbsp;)+".join(re.escape(w) for w in k.split())
+        for k in (FILM_NAME, *_FALLBACK_KEYS)
+    )
+)
+_WS_RE = re.compile(r"\s+")
+# Lettres accentuées (minuscules: normalize() passe en minuscules avant) -> lettre de base
+_ACCENT_MAP = str.maketrans({c: unicodedata.normalize("NFD", c)[0] for c in "àáâãäåçèéêëìíîïñòóôõöùúûüýÿ"})
+_FILM_KEYWORD_RE = re.compile(re.escape(FILM_KEYWORD), re.I)
+_CINEMA_KEYWORD_RE = re.compile(re.escape(CINEMA_KEYWORD), re.I)
+# Id du film isolé (pas 113870 ni 211387)
+_FILM_ID_RE = re.compile(rf"(?<!\d){re.escape(FILM_ID)}(?!\d)")
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Valeur JSON qui est un horaire: "20:15", "20:15:00" ou "2025-12-17T20:15:00"
+_SHOWTIME_VALUE_RE = re.compile(r"(?:^|[T\s])(?:[01]\d|2[0-3]):[0-5]\d")
+# Les libellés d'acceptation restent libres ("Tout accepter et fermer", "Accepter & Fermer",
+# "Accepter les cookies"...); seuls les mots courts et ambigus sont ancrés, sinon "ok"
+# matcherait "cookies" et "fermer" n'importe quel "Fermer le menu"
+_COOKIE_RE = re.compile(r"tout accepter|accepter|j'?accepte|^continuer$|^ok$|^fermer$", re.I)
+_DAY_BUTTONS = [(label, re.compile(label, re.I)) for label in ["Aujourd'hui", "Demain"]]
+
+# innerText du bloc du premier titre FILM_TITLE_SELECTOR qui mentionne FILM_KEYWORD (ou null):
+# on remonte du h3 tant que le parent ne contient pas le titre d'un autre film
+_FILM_BLOCK_JS = """([selector, keyword]) => {
+    const kw = keyword.toLowerCase();
+    for (const title of document.querySelectorAll(selector)) {
+        if (!title.textContent.toLowerCase().includes(kw)) continue;
+        let block = title.closest("h3");
+        while (block.parentElement && block.parentElement.querySelectorAll("h3").length === 1) {
+            block = block.parentElement;
+        }
+        return block.innerText;
+    }
+    return null;
+}"""
+# Repli sans bloc du film: analyse faite dans la page (V8), seuls deux nombres reviennent
+# (mêmes règles que analyze_cinema_page: clés normalisées _FILM_KEYS_N, horaires uniques < 24h)
+_PAGE_SCAN_JS = r"""(keys) => {
+    const t = document.body.innerText.toLowerCase()
+        .normalize("NFD").replace(/[\u0300-\u036f]/g, "")
+        .replace(/\s+/g, " ");
+    const times = new Set((t.match(/\b[012]\d:[0-5]\d\b/g) || []).filter((hm) => hm < "24"));
+    return {n: times.size, filmOk: keys.some((k) => t.includes(k))};
+}"""
+
+# --- HTTP ---
+HTTP_TIMEOUT = 15
+HTTP_CONCURRENCY = 8
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "fr-FR,fr;q=0.9",
+}
+HOST_MIN_INTERVAL = 1.5  # secondes entre deux requêtes vers le même hôte
+RETRY_ATTEMPTS = 5
+RETRY_MAX_WAIT = 30  # secondes
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+_NEXT_DATA_RE = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+
+_last_fetch_ts: dict[str, float] = {}
+_host_locks: dict[str, asyncio.Lock] = {}
+
+# --- Playwright (pool de navigateurs) ---
+# Chromium persistant à réutiliser (ex: http://127.0.0.1:9222); vide = lancement local
+CDP_URL = os.environ.get("PATHE_CDP_URL", "")
+# Profil Chromium persistant (ex: ./.chromium-profile): cookies/cache gardés d'un run à l'autre
+PROFILE_DIR = os.environ.get("PATHE_PROFILE_DIR", "")
+POOL_MAX_SIZE = 2
+POOL_MAX_USES = 50
+POOL_MAX_AGE = 600  # secondes
+POOL_IDLE_TIMEOUT = 300  # secondes
+# Cookies posés par les CMP courantes (Didomi, Axeptio, OneTrust, Cookiebot)
+CONSENT_COOKIE_NAMES = {
+    "didomi_token",
+    "euconsent-v2",
+    "axeptio_cookies",
+    "axeptio_authorized_vendors",
+    "axeptio_all_vendors",
+    "OptanonConsent",
+    "OptanonAlertBoxClosed",
+    "CookieConsent",
+}
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet", "texttrack", "manifest"}
+CHROMIUM_ARGS = [
+    "--disable-dev-shm-usage",  # /dev/shm minuscule dans les conteneurs CI
+    "--disable-extensions",
+    "--disable-background-networking",
+]
+BLOCKED_DOMAINS = [
+    "doubleclick.net",
+    "googletagmanager.com",
+    "google-analytics.com",
+    "googlesyndication.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "criteo.com",
+    "criteo.net",
+    "tiktok.com",
+]
+
+# --- Mode daemon ---
+POLL_INTERVAL = 300  # secondes
+METRICS = {
+    "poll_count": 0,
+    "poll_duration_seconds": 0.0,
+    "email_sent_total": 0,
+    "poll_errors_total": 0,
+    "poll_missed_total": 0,
+}
 
 # --- SMTP Brevo ---
+BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
 SMTP_HOST = "smtp-relay.brevo.com"
 SMTP_PORT = 587
 
@@ -30,206 +203,1062 @@ def log(message: str):
     print(f"[{ts}] {message}", flush=True)
 
 
+def json_loads(data: bytes | str):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps_pretty(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
 def read_state() -> dict:
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            log(f"⚠️ Impossible de lire {STATE_FILE} ({e}). État par défaut.")
+    # Un seul open (pas de os.path.exists avant): pas de syscall en plus ni de course
+    try:
+        with open(STATE_FILE, "rb") as f:
+            return json_loads(f.read())
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:  # orjson.JSONDecodeError hérite de ValueError
+        log(f"⚠️ Impossible de lire {STATE_FILE} ({e}). État par défaut.")
     return {"last_status": "unavailable", "last_seen_at": None}
 
 
 def write_state(state: dict) -> None:
+    """
+    Écriture atomique (fichier temporaire + os.replace): un crash en pleine écriture
+    ne laisse jamais un state.json vide, qui ferait repartir last_status à
+    "unavailable" et renverrait l'email.
+    """
+    tmp = STATE_FILE + ".tmp"
     try:
-        with open(STATE_FILE, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+        with open(tmp, "wb") as f:
+            f.write(json_dumps_pretty(state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, STATE_FILE)
     except Exception as e:
         log(f"❌ Impossible d'écrire {STATE_FILE}: {e}")
 
 
-def accept_cookies(page) -> None:
+async def accept_cookies(page) -> bool:
     """
     Essaie de fermer/valider le bandeau cookies Pathé.
-    Ne plante jamais si absent.
-    """
-    candidates = [
-        ("button", r"Tout accepter"),
-        ("button", r"Accepter( et fermer)?"),
-        ("button", r"J'?accepte"),
-        ("button", r"Continuer"),
-        ("button", r"OK"),
-        ("button", r"Fermer"),
-        ("link", r"Tout accepter"),
-        ("link", r"Accepter"),
+    Une seule regex (_COOKIE_RE) et un seul locator composite (bouton, sinon lien):
+    une seule attente de 5 s max au lieu de tester chaque libellé l'un après l'autre.
+    Ne plante jamais si absent; renvoie True si le bandeau a été validé.
+    """
+    consent = page.get_by_role("button", name=_COOKIE_RE).or_(
+        page.get_by_role("link", name=_COOKIE_RE)
+    )
+    try:
+        await consent.first.click(timeout=5000)
+        log("🍪 Cookies acceptés/fermés")
+        return True
+    except Exception:
+        return False
+
+
+def valid_consent_cookies(state: dict) -> list[dict]:
+    """Cookies de consentement CMP mémorisés dans state.json et pas encore expirés."""
+    now = time.time()
+    return [
+        c for c in state.get("consent_cookies") or []
+        if c.get("expires", -1) == -1 or c["expires"] > now
     ]
 
-    for _ in range(3):
-        for role, pattern in candidates:
-            try:
-                page.get_by_role(role, name=re.compile(pattern, re.I)).click(timeout=1500)
-                log("🍪 Cookies acceptés/fermés")
-                page.wait_for_timeout(400)
-                return
-            except Exception:
-                pass
-        page.wait_for_timeout(700)
+
+async def save_consent_cookies(page, state: dict) -> None:
+    """Mémorise les cookies de consentement posés par la CMP pour les prochains runs."""
+    cookies = [c for c in await page.context.cookies() if c["name"] in CONSENT_COOKIE_NAMES]
+    if cookies:
+        state["consent_cookies"] = cookies
+        log(f"🍪 {len(cookies)} cookie(s) de consentement mémorisé(s)")
+
+
+def normalize(s: str) -> str:
+    s = s.replace("\u00a0", " ").lower().translate(_ACCENT_MAP)
+    s = _WS_RE.sub(" ", s).strip()
+    return s
+
+
+def is_horaire(hhmm: str) -> bool:
+    """Filtre des matchs de _HORAIRE_RE: heure < 24 (comparaison de chaînes, "23:59" < "24")."""
+    return hhmm < "24"
 
 
-def check_availability() -> tuple[bool, dict]:
+_FILM_NAME_N = normalize(FILM_NAME)
+# Même alternance côté texte normalisé (minuscules, sans accents ni espaces insécables)
+_FILM_KEYS_N = (_FILM_NAME_N, *_FALLBACK_KEYS)
+_FILM_TEXT_RE = _scan_re.compile("|".join(re.escape(k) for k in _FILM_KEYS_N))
+
+
+def analyze_cinema_page(html: str, text: str, debug_info: dict) -> bool:
     """
-    Stratégie simple:
-    - Ouvre CINEMA_URL
-    - Accepte cookies
-    - Essaie de cliquer 'Aujourd'hui' / 'Demain' si dispo
-    - Récupère HTML (page.content) + texte (inner_text)
-    - Détecte FILM_NAME (en version 'avatar' pour test) + horaires HH:MM
+    Page cinéma: détecte FILM_NAME (en version 'avatar' pour test) + horaires HH:MM
+    dans le HTML et/ou le texte.
+    Seul le texte (petit) est normalisé; le HTML est scanné brut.
     """
-    import unicodedata
+    text_n = normalize(text)
 
-    debug_info = {
-        "film_found": False,
-        "nb_horaires": 0,
-        "error": None,
-        "used": [],
+    # Détection film (pour être robuste, on utilise au moins le mot "avatar" ici)
+    # Quand tu passeras à Jana Nayagan, on mettra un mot-clé stable.
+    # fallback ultra robuste: au moins "avatar" (pour ton test actuel), dans les deux regex
+    film_found = _FILM_HTML_RE.search(html) is not None or _FILM_TEXT_RE.search(text_n) is not None
+    debug_info["film_found_on_cinema_page"] = film_found
+
+    # Horaires HH:MM (dans HTML ou texte): des chiffres, rien à normaliser côté HTML.
+    # Un seul set alimenté au fil des matchs (sans double compter, sans listes intermédiaires)
+    seen = set()
+    for source in (html, text_n):
+        for m in _HORAIRE_RE.finditer(source):
+            if is_horaire(m.group()):
+                seen.add(m.group())
+    debug_info["nb_horaires"] = len(seen)
+
+    return film_found and debug_info["nb_horaires"] > 0
+
+
+def analyze_film_page(text: str, debug_info: dict) -> bool:
+    """
+    Page film: mot-clé cinéma + (signal de réservation OU horaire HH:MM).
+    """
+    # Recherche insensible à la casse directement sur le texte brut: pas de copie normalisée
+    cinema_found = _CINEMA_KEYWORD_RE.search(text) is not None
+    debug_info["cinema_found_on_film_page"] = cinema_found
+
+    # Un seul passage sur le texte pour les signaux de réservation et les horaires
+    reservation_signal = False
+    horaires = set()
+    for m in _RESERVATION_HORAIRE_RE.finditer(text):
+        if m.group("r"):
+            reservation_signal = True
+        elif is_horaire(m.group()):
+            horaires.add(m.group())
+    debug_info["reservation_signal"] = reservation_signal
+    debug_info["nb_horaires_film_page"] = len(horaires)
+
+    return cinema_found and (debug_info["reservation_signal"] or debug_info["nb_horaires_film_page"] > 0)
+
+
+def refers_to_film(node: dict) -> bool:
+    """
+    Objet JSON qui désigne le film: id (11387) sous une clé *id, slug/URL du film,
+    ou titre exact. Pas le mot-clé seul ("avatar" est aussi un champ de photo de profil).
+    """
+    for key, value in node.items():
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, str)) and str(key).lower().endswith("id") and str(value) == FILM_ID:
+            return True
+        if isinstance(value, str) and (FILM_SLUG in value or normalize(value) == _FILM_NAME_N):
+            return True
+    return False
+
+
+def refers_to_other(node: dict) -> str | None:
+    """
+    Objet JSON qui désigne autre chose que le film (à n'appeler que si refers_to_film
+    est faux): "film" si une clé de film (FILM_REF_KEYS) porte un autre id/slug,
+    "entity" pour un autre *id (cinéma, séance...), None sans identifiant.
+    """
+    other = None
+    for key, value in node.items():
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            continue
+        key = str(key).lower()
+        if key in FILM_REF_KEYS:
+            return "film"
+        if key.endswith("id"):
+            other = "entity"
+    return other
+
+
+def json_text_values(data):
+    """
+    Valeurs texte d'un JSON (pour les scans regex), sans les dates ISO: leur
+    "T00:00" n'est pas un horaire de séance.
+    """
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, str) and not _ISO_DATE_RE.match(node):
+            yield node
+
+
+def walk_film_showtimes(data) -> tuple[bool, set[str]]:
+    """
+    Parcours (itératif) d'un JSON de séances: repère les sous-arbres du film (objet qui
+    le désigne, objet dont un enfant direct le désigne, ou clé contenant son id) et y
+    collecte les valeurs horaires ("20:15", "2025-12-17T20:15:00"...) rangées sous une
+    clé de séances (SHOWTIME_KEYS): une date de sortie ("releaseAt") n'est pas une séance.
+    Un objet qui porte un autre id (autre film, film "related"...) sort du sous-arbre du
+    film, sauf une séance ou un cinéma sous une clé de séances (leur id n'est pas un film).
+    Renvoie (film trouvé, horaires uniques).
+    """
+    film_found = False
+    showtimes: set[str] = set()
+    stack = [(data, False, False)]
+    while stack:
+        node, in_film, in_shows = stack.pop()
+        if isinstance(node, dict):
+            if refers_to_film(node) or any(
+                isinstance(v, dict) and refers_to_film(v) for v in node.values()
+            ):
+                # {"film": {"id": 11387}, "showtimes": [...]}: les séances voisines comptent aussi.
+                # Les clés de séances comptent à partir de l'objet du film, pas au-dessus
+                in_film, in_shows = True, False
+            else:
+                other = refers_to_other(node)
+                if other == "film" or (other == "entity" and not in_shows):
+                    in_film = False
+            film_found = film_found or in_film
+            for key, value in node.items():
+                key_is_film = _FILM_ID_RE.search(str(key)) is not None
+                child_in_film = in_film or key_is_film
+                child_in_shows = in_shows or str(key).lower() in SHOWTIME_KEYS
+                film_found = film_found or child_in_film
+                stack.append((value, child_in_film, child_in_shows))
+        elif isinstance(node, list):
+            stack.extend((item, in_film, in_shows) for item in node)
+        elif in_film and in_shows and isinstance(node, str) and _SHOWTIME_VALUE_RE.search(node):
+            showtimes.add(node)
+    return film_found, showtimes
+
+
+def analyze_film_json(data, debug_info: dict) -> bool:
+    """JSON de l'API: film présent + au moins un horaire dans ses séances."""
+    film_found, showtimes = walk_film_showtimes(data)
+    debug_info["film_found_on_cinema_page"] = film_found
+    debug_info["nb_horaires"] = len(showtimes)
+    return film_found and len(showtimes) > 0
+
+
+def make_client() -> httpx.AsyncClient:
+    """Client HTTP partagé (keep-alive + HTTP/2) pour amortir les handshakes TLS."""
+    return httpx.AsyncClient(
+        http2=True,
+        headers=HTTP_HEADERS,
+        timeout=HTTP_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=HTTP_CONCURRENCY),
+    )
+
+
+async def fetch(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    url: str,
+    http_cache: dict,
+    analyses: tuple[str, ...],
+    headers: dict | None = None,
+) -> httpx.Response:
+    """
+    GET conditionnel (If-None-Match / If-Modified-Since) si la page est en cache avec
+    une analyse réutilisable (voir reusable_entry): sinon un 304 n'aurait pas de corps à analyser.
+    """
+    entry = reusable_entry(http_cache, url, analyses) or {}
+    headers = dict(headers or {})
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    host = urlsplit(url).hostname or ""
+    attempt = 0
+    while True:
+        attempt += 1
+        await wait_politeness(host)
+        try:
+            async with sem:
+                log(f"🌐 GET {url}")
+                r = await client.get(url, headers=headers)
+            if r.status_code != 304:
+                r.raise_for_status()
+            return r
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code not in RETRY_STATUSES:
+                raise
+            if attempt == RETRY_ATTEMPTS:
+                raise
+            wait = min(RETRY_MAX_WAIT, 2 ** (attempt - 1))
+            if isinstance(e, httpx.HTTPStatusError):
+                delay = retry_after(e.response)
+                if delay is not None:
+                    if delay > RETRY_MAX_WAIT:
+                        # Inutile de bloquer le run: le prochain tick réessaiera
+                        raise
+                    wait = delay
+            log(f"⏳ {e} — nouvel essai {attempt + 1}/{RETRY_ATTEMPTS} dans {wait:.1f} s")
+            await asyncio.sleep(wait)
+
+
+async def wait_politeness(host: str) -> None:
+    """Au moins HOST_MIN_INTERVAL secondes entre deux requêtes vers le même hôte."""
+    lock = _host_locks.setdefault(host, asyncio.Lock())
+    async with lock:
+        delay = HOST_MIN_INTERVAL - (time.monotonic() - _last_fetch_ts.get(host, float("-inf")))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        _last_fetch_ts[host] = time.monotonic()
+
+
+def retry_after(r: httpx.Response) -> float | None:
+    """Délai demandé par l'en-tête Retry-After (secondes ou date HTTP), sinon None."""
+    value = r.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def body_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def reusable_entry(http_cache: dict, url: str, analyses: tuple[str, ...]) -> dict | None:
+    """
+    Entrée de cache dont le verdict peut resservir: produite par une des analyses
+    acceptées (`analyses`) avec les règles actuelles (ANALYSIS_VERSION).
+    """
+    entry = http_cache.get(url)
+    if not entry or "result" not in entry:
+        return None
+    if entry.get("version") != ANALYSIS_VERSION or entry.get("analysis") not in analyses:
+        return None
+    return entry
+
+
+def cached_analysis(
+    http_cache: dict, url: str, r: httpx.Response, debug_info: dict, analyses: tuple[str, ...]
+) -> bool | None:
+    """
+    Réutilise l'analyse du poll précédent si la page n'a pas changé:
+    304 Not Modified, ou même empreinte du contenu (Pathé n'envoie pas toujours d'ETag),
+    si l'entrée est réutilisable (reusable_entry). Renvoie None si la page doit être réanalysée.
+    """
+    entry = reusable_entry(http_cache, url, analyses)
+    if entry is None:
+        return None
+    if r.status_code != 304 and entry.get("body_hash") != body_hash(r.content):
+        return None
+
+    result = dict(entry["result"])
+    ok = result.pop("ok")
+    debug_info.update(result)
+    debug_info["used"].append(f"cache:{r.status_code}")
+    return ok
+
+
+def store_analysis(
+    http_cache: dict, url: str, r: httpx.Response, ok: bool, page_info: dict, analysis: str
+) -> None:
+    http_cache[url] = {
+        "etag": r.headers.get("etag"),
+        "last_modified": r.headers.get("last-modified"),
+        "body_hash": body_hash(r.content),
+        "version": ANALYSIS_VERSION,
+        "analysis": analysis,
+        "result": {"ok": ok, **page_info},
     }
 
-    def normalize(s: str) -> str:
-        s = s.replace("\u00a0", " ").lower()
-        s = "".join(
-            c for c in unicodedata.normalize("NFD", s)
-            if unicodedata.category(c) != "Mn"
-        )
-        s = re.sub(r"\s+", " ", s).strip()
-        return s
-
-    def accept_cookies(page) -> None:
-        for _ in range(4):
-            for txt in ["Tout accepter", "Accepter", "J'accepte", "OK", "Continuer"]:
-                try:
-                    page.get_by_role("button", name=re.compile(txt, re.I)).click(timeout=1500)
-                    log("🍪 Cookies acceptés/fermés")
-                    page.wait_for_timeout(400)
-                    return
-                except Exception:
-                    pass
-            page.wait_for_timeout(700)
 
+def extract_next_data(html: str):
+    """
+    Renvoie les props (déjà décodées) du JSON Next.js __NEXT_DATA__ (rendu serveur),
+    ou None si absent/illisible.
+    """
+    m = _NEXT_DATA_RE.search(html)
+    if not m:
+        return None
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
+        data = json_loads(m.group(1))
+    except ValueError as e:
+        log(f"⚠️ __NEXT_DATA__ illisible ({e})")
+        return None
+    return data.get("props", {}).get("pageProps", data)
+
+
+async def block_heavy_resources(route) -> None:
+    """
+    Coupe images/médias/polices/CSS et trackers: inutiles pour lire les horaires,
+    et ce sont eux qui rallongent le chargement de la page.
+    """
+    request = route.request
+    host = urlsplit(request.url).hostname or ""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        host == d or host.endswith("." + d) for d in BLOCKED_DOMAINS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+@dataclass
+class PooledBrowser:
+    browser: Any
+    # Contexte persistant (PROFILE_DIR): partagé par toutes les pages, browser vaut alors None
+    context: Any = None
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+    usage_count: int = 0
+    state: str = "idle"  # idle | busy
+
+
+class BrowserPool:
+    """
+    Pool de navigateurs Chromium gardés ouverts entre les vérifications (mode daemon),
+    pour ne pas payer le lancement de Chromium (~1-2 s) à chaque tick.
+    Chaque acquire() ouvre un contexte + une page neufs; un navigateur est recyclé
+    après max_uses pages, max_age secondes ou s'il est déconnecté.
+    Avec PROFILE_DIR, un seul contexte persistant (un profil ne s'ouvre qu'une fois):
+    acquire() n'y ouvre qu'une page, et release() ne ferme que cette page.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = POOL_MAX_SIZE,
+        max_uses: int = POOL_MAX_USES,
+        max_age: float = POOL_MAX_AGE,
+        idle_timeout: float = POOL_IDLE_TIMEOUT,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self._playwright = None
+        self._entries: list[PooledBrowser] = []
+        self._pages: dict = {}
+        self._cond: asyncio.Condition | None = None
+
+    def _is_healthy(self, entry: PooledBrowser) -> bool:
+        return (
+            (entry.context is not None or entry.browser.is_connected())
+            and entry.usage_count < self.max_uses
+            and time.monotonic() - entry.created_at < self.max_age
+        )
+
+    async def _launch(self) -> PooledBrowser:
+        if self._playwright is None:
+            # Import paresseux: la plupart des runs (HTTP / cache) n'ont jamais besoin de Chromium
+            from playwright.async_api import async_playwright  # type: ignore
+
+            self._playwright = await async_playwright().start()
+        if CDP_URL:
+            # Chromium déjà lancé en service (--remote-debugging-port): pas de cold-start
+            browser = await self._playwright.chromium.connect_over_cdp(CDP_URL)
+            log(f"🔌 Connecté à Chromium via CDP: {CDP_URL}")
+        elif PROFILE_DIR:
+            # Profil sur disque: cookies de consentement et cache HTTP survivent au run
+            context = await self._playwright.chromium.launch_persistent_context(
+                PROFILE_DIR,
+                headless=True,
+                args=CHROMIUM_ARGS,
                 locale="fr-FR",
                 viewport={"width": 1400, "height": 900},
             )
-            page = context.new_page()
-            page.set_default_timeout(60000)
-
-            log(f"🏢 Ouverture cinéma: {CINEMA_URL}")
-            page.goto(CINEMA_URL, wait_until="domcontentloaded")
-            page.wait_for_timeout(2500)
-            accept_cookies(page)
-
-            # Petites actions pour forcer le rendu des séances (si boutons présents)
-            for label in ["Aujourd'hui", "Demain"]:
-                try:
-                    page.get_by_role("button", name=re.compile(label, re.I)).click(timeout=2000)
-                    debug_info["used"].append(f"click:{label}")
-                    page.wait_for_timeout(1200)
-                except Exception:
-                    pass
-
-            # Scroll pour charger lazy content
+            await context.route("**/*", block_heavy_resources)
+            log(f"🚀 Chromium lancé avec le profil {PROFILE_DIR}")
+            entry = PooledBrowser(None, context)
+            self._entries.append(entry)
+            return entry
+        else:
+            browser = await self._playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+            log(f"🚀 Chromium lancé (pool: {len(self._entries) + 1}/{self.max_size})")
+        entry = PooledBrowser(browser)
+        self._entries.append(entry)
+        return entry
+
+    async def _retire(self, entry: PooledBrowser) -> None:
+        self._entries.remove(entry)
+        try:
+            # Via CDP, close() ferme nos contextes et se déconnecte sans tuer le Chromium distant
+            await (entry.context or entry.browser).close()
+        except Exception:
+            pass
+        log(f"♻️ Chromium recyclé après {entry.usage_count} utilisation(s)")
+
+    async def _take_idle(self) -> PooledBrowser | None:
+        for entry in [e for e in self._entries if e.state == "idle"]:
+            if self._is_healthy(entry):
+                return entry
+            await self._retire(entry)
+        return None
+
+    async def acquire(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            entry = await self._take_idle()
+            while entry is None and len(self._entries) >= self.max_size:
+                await self._cond.wait()
+                entry = await self._take_idle()
+            if entry is None:
+                entry = await self._launch()
+            entry.state = "busy"
+            entry.usage_count += 1
+
+        try:
+            if entry.context is not None:
+                page = await entry.context.new_page()
+            else:
+                context = await entry.browser.new_context(
+                    locale="fr-FR",
+                    viewport={"width": 1400, "height": 900},
+                )
+                await context.route("**/*", block_heavy_resources)
+                page = await context.new_page()
+        except Exception:
+            entry.usage_count = self.max_uses  # navigateur suspect: recyclé au release
+            await self._release_entry(entry)
+            raise
+        self._pages[page] = entry
+        return page
+
+    async def release(self, page) -> None:
+        entry = self._pages.pop(page, None)
+        try:
+            if entry is not None and entry.context is not None:
+                await page.close()  # le contexte persistant reste ouvert
+            else:
+                await page.context.close()
+        except Exception:
+            pass
+        if entry is not None:
+            await self._release_entry(entry)
+
+    async def _release_entry(self, entry: PooledBrowser) -> None:
+        async with self._cond:
+            entry.state = "idle"
+            entry.last_used_at = time.monotonic()
+            if not self._is_healthy(entry):
+                await self._retire(entry)
+            self._cond.notify()
+
+    async def reap_idle(self) -> None:
+        """Ferme les navigateurs inactifs depuis plus de idle_timeout (en gardant min_size)."""
+        if self._cond is None:
+            return
+        async with self._cond:
+            now = time.monotonic()
+            for entry in list(self._entries):
+                if len(self._entries) <= self.min_size:
+                    break
+                if entry.state == "idle" and now - entry.last_used_at > self.idle_timeout:
+                    await self._retire(entry)
+
+    async def close(self) -> None:
+        for entry in list(self._entries):
+            await self._retire(entry)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+# Un profil persistant est verrouillé par un seul Chromium à la fois
+browser_pool = BrowserPool(max_size=1 if PROFILE_DIR and not CDP_URL else POOL_MAX_SIZE)
+
+
+def is_pathe_xhr(resp) -> bool:
+    """Réponse XHR/fetch de pathe.fr susceptible de porter les séances (filtre sans lire le corps)."""
+    url = resp.url
+    return (
+        "pathe.fr" in url
+        and any(k in url for k in XHR_URL_KEYWORDS)
+        and resp.request.resource_type in ("xhr", "fetch")
+    )
+
+
+async def render_cinema_page(debug_info: dict, state: dict, page_info: dict) -> bool:
+    """
+    Rendu complet via Playwright (fallback --render):
+    - Injecte les cookies de consentement mémorisés (pas de bandeau)
+    - Ouvre CINEMA_URL
+    - Sinon accepte cookies (seulement si le titre du film n'est pas déjà accessible)
+      et mémorise le consentement pour les runs suivants
+    - Essaie de cliquer 'Aujourd'hui' / 'Demain' si dispo, en attendant la réponse
+      XHR des séances que déclenche le clic
+    - Analyse le texte du seul bloc du film (titre FILM_TITLE_SELECTOR),
+      sinon compte film + horaires directement dans la page (_PAGE_SCAN_JS)
+    Le résultat de l'analyse va dans page_info; debug_info["used"] trace les étapes.
+    """
+    page = await browser_pool.acquire()
+    try:
+        page.set_default_timeout(60000)
+
+        consent_cookies = valid_consent_cookies(state)
+        if consent_cookies:
+            await page.context.add_cookies(consent_cookies)
+            debug_info["used"].append("consent_cookies")
+
+        log(f"🏢 Ouverture cinéma: {CINEMA_URL}")
+        await page.goto(CINEMA_URL, wait_until="domcontentloaded")
+
+        # Sonde courte sur le titre du film (au lieu d'un délai fixe)
+        film_title = page.locator(FILM_TITLE_SELECTOR).filter(has_text=_FILM_KEYWORD_RE).first
+        try:
+            await film_title.wait_for(state="attached", timeout=FILM_TITLE_PROBE_TIMEOUT)
+            title_attached = True
+        except Exception:
+            # Titre absent du DOM: inutile de l'attendre encore plus bas
+            title_attached = False
+
+        # Le bandeau cookies est un overlay: il ne gêne pas la lecture du bloc
+        if not consent_cookies and not title_attached:
+            if await accept_cookies(page):
+                await save_consent_cookies(page, state)
+
+        # Petites actions pour forcer le rendu des séances (si boutons présents):
+        # chaque clic recharge les séances par XHR, on attend cette réponse
+        for label, pattern in _DAY_BUTTONS:
             try:
-                page.mouse.wheel(0, 2500)
-                debug_info["used"].append("scroll")
+                async with page.expect_response(is_pathe_xhr, timeout=DAY_CLICK_RESPONSE_TIMEOUT):
+                    await page.get_by_role("button", name=pattern).click(timeout=2000)
+                debug_info["used"].append(f"click:{label}")
             except Exception:
                 pass
 
-            page.wait_for_timeout(4000)
+        # Scroll pour charger lazy content
+        try:
+            await page.mouse.wheel(0, 2500)
+            debug_info["used"].append("scroll")
+        except Exception:
+            pass
 
-            # Récupère HTML + texte
-            html = page.content()
-            debug_info["used"].append("page.content")
+        # Texte du bloc du film uniquement: pas d'horaires des autres films.
+        # Extrait dans la page (un seul aller-retour CDP, seul le sous-arbre revient)
+        if title_attached:
             try:
-                text = page.inner_text("body")
-                debug_info["used"].append("inner_text")
+                await film_title.wait_for(state="visible", timeout=FILM_TITLE_PROBE_TIMEOUT)
             except Exception:
-                text = ""
+                pass
+        text = await page.evaluate(_FILM_BLOCK_JS, [FILM_TITLE_SELECTOR, FILM_KEYWORD])
+        if text:
+            debug_info["used"].append("film_block")
+            return analyze_cinema_page("", text, page_info)
+        log("ℹ️ Bloc du film introuvable, analyse de toute la page")
+
+        # Pas de page.content()/inner_text: le DOM entier ne traverse pas CDP
+        scan = await page.evaluate(_PAGE_SCAN_JS, list(_FILM_KEYS_N))
+        debug_info["used"].append("page_scan")
+    finally:
+        await browser_pool.release(page)
+
+    page_info["film_found_on_cinema_page"] = scan["filmOk"]
+    page_info["nb_horaires"] = scan["n"]
+    return scan["filmOk"] and scan["n"] > 0
+
+
+async def capture_film_xhr(
+    consent_cookies: list[dict] | None = None, wait_all: bool = False
+) -> list[tuple[str, int]]:
+    """
+    Ouvre CINEMA_URL dans Playwright et capture les réponses JSON (XHR/fetch) de pathe.fr
+    qui contiennent des séances du film. Renvoie [(url, nb_horaires)], les plus riches d'abord.
+    Rend la main dès la première réponse utile (au plus XHR_TIMEOUT s), ou attend
+    que le réseau soit calme si wait_all=True (--discover: toutes les candidates).
+    """
+    hits: list[tuple[str, int]] = []
+    found = asyncio.Event()
+
+    async def on_response(resp) -> None:
+        # Filtres gratuits (URL, type, en-têtes) avant de rapatrier le corps via CDP
+        url = resp.url
+        if not is_pathe_xhr(resp):
+            return
+        if not resp.headers.get("content-type", "").startswith("application/json"):
+            return
+        try:
+            data = json_loads(await resp.body())
+        except Exception:
+            return
+        # Parcours typé du JSON: horaires du film lui-même, pas de n'importe quel champ
+        film_found, showtimes = walk_film_showtimes(data)
+        if film_found and showtimes:
+            hits.append((url, len(showtimes)))
+            found.set()
+
+    page = await browser_pool.acquire()
+    try:
+        if consent_cookies:
+            await page.context.add_cookies(consent_cookies)
+        page.on("response", on_response)
+        log(f"🧭 Capture des XHR: {CINEMA_URL}")
+        # "commit": les XHR sont captées au fil de l'eau, inutile d'attendre le chargement
+        await page.goto(CINEMA_URL, wait_until="commit")
+        if wait_all:
+            await page.wait_for_load_state("networkidle")
+        else:
+            try:
+                await asyncio.wait_for(found.wait(), XHR_TIMEOUT)
+            except asyncio.TimeoutError:
+                log(f"⏱️ Aucune réponse JSON avec horaires après {XHR_TIMEOUT} s")
+    finally:
+        await browser_pool.release(page)
+
+    return sorted(hits, key=lambda h: -h[1])
+
+
+async def discover_api_urls() -> list[tuple[str, int]]:
+    """Endpoints JSON candidats pour PATHE_API_URL (voir capture_film_xhr)."""
+    hits = await capture_film_xhr(wait_all=True)
+    if not hits:
+        log("ℹ️ Aucune réponse JSON avec horaires trouvée")
+    return hits
+
+
+async def check_cinema_page(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, state: dict, debug_info: dict, render: bool
+) -> bool:
+    """
+    Page cinéma en HTTP: JSON __NEXT_DATA__ si présent, sinon rendu Playwright
+    si render=True, sinon scan du HTML brut. Avec render=True, un __NEXT_DATA__
+    sans séance du film (chargées ensuite par XHR) passe aussi par le rendu.
+    """
+    http_cache = state.setdefault("http_cache", {})
+    # Même corps => même présence de __NEXT_DATA__; un scan du HTML brut, ou un
+    # __NEXT_DATA__ sans séance ("next_data_empty"), ne vaut pas un rendu
+    analyses = ("next_data",) if render else ("next_data", "next_data_empty", "html")
+    cinema = await fetch(client, sem, CINEMA_URL, http_cache, analyses)
+    debug_info["used"].append(f"http:cinema:{cinema.status_code}")
+
+    cinema_ok = cached_analysis(http_cache, CINEMA_URL, cinema, debug_info, analyses)
+    if cinema_ok is not None:
+        return cinema_ok
+
+    page_info = {}
+    props = extract_next_data(cinema.text)
+    if props is not None:
+        # Le JSON suffit s'il porte les séances: parcouru tel quel, sans rescanner le HTML
+        debug_info["used"].append("__NEXT_DATA__")
+        cinema_ok = analyze_film_json(props, page_info)
+        if cinema_ok or not render:
+            analysis = "next_data" if cinema_ok else "next_data_empty"
+            store_analysis(http_cache, CINEMA_URL, cinema, cinema_ok, page_info, analysis)
+            debug_info.update(page_info)
+            return cinema_ok
+        log("ℹ️ Aucune séance dans __NEXT_DATA__, fallback rendu Playwright")
+    elif render:
+        log("ℹ️ __NEXT_DATA__ absent, fallback rendu Playwright")
+
+    if render:
+        page_info = {}
+        cinema_ok = await render_cinema_page(debug_info, state, page_info)
+        # Le rendu dépend des XHR: le HTML inchangé ne garantit rien
+        http_cache.pop(CINEMA_URL, None)
+    else:
+        debug_info["used"].append("html")
+        cinema_ok = analyze_cinema_page(cinema.text, "", page_info)
+        store_analysis(http_cache, CINEMA_URL, cinema, cinema_ok, page_info, "html")
+    debug_info.update(page_info)
+    return cinema_ok
+
+
+async def check_film_page(client: httpx.AsyncClient, sem: asyncio.Semaphore, state: dict, debug_info: dict) -> bool:
+    """Page film en HTTP: mot-clé cinéma + signaux de réservation / horaires."""
+    http_cache = state.setdefault("http_cache", {})
+    film = await fetch(client, sem, FILM_URL, http_cache, ("film",))
+    debug_info["used"].append(f"http:film:{film.status_code}")
+
+    film_ok = cached_analysis(http_cache, FILM_URL, film, debug_info, ("film",))
+    if film_ok is not None:
+        return film_ok
+
+    page_info = {}
+    props = extract_next_data(film.text)
+    film_text = "\n".join(json_text_values(props)) if props is not None else film.text
+    film_ok = analyze_film_page(film_text, page_info)
+    store_analysis(http_cache, FILM_URL, film, film_ok, page_info, "film")
+    debug_info.update(page_info)
+    return film_ok
+
+
+async def check_film_page_advisory(client, sem, state, debug_info) -> None:
+    """
+    Page film à titre indicatif (signaux Brumath/réservation dans les logs et l'email):
+    n'entre pas dans la décision, et une erreur HTTP n'y fait pas échouer la vérification.
+    """
+    try:
+        await check_film_page(client, sem, state, debug_info)
+    except httpx.HTTPError as e:
+        log(f"⚠️ Page film ignorée ({e})")
+        debug_info["used"].append("http:film:error")
+
+
+async def strategy_pages(client, sem, state, debug_info, render) -> bool:
+    """
+    Pages cinéma et film en parallèle. Disponible si le film est sur la page cinéma
+    avec des horaires; la page film n'est qu'indicative (elle liste tous les cinémas,
+    Brumath et "Réserver" y figurent même sans séance à Brumath).
+    """
+    cinema_ok, _ = await asyncio.gather(
+        check_cinema_page(client, sem, state, debug_info, render),
+        check_film_page_advisory(client, sem, state, debug_info),
+    )
+    return cinema_ok
+
+
+async def strategy_auto(client, sem, state, debug_info, render) -> bool:
+    """
+    Endpoint JSON de Pathé (API_URL) en direct: ni HTML ni navigateur, et le JSON
+    est parcouru tel quel (walk_film_showtimes) au lieu d'être scanné par regex.
+    Pages HTML (strategy_pages) si API_URL n'est pas configuré, si l'API répond 4xx
+    (hors 429), ou si sa réponse n'est plus du JSON (endpoint déplacé / schéma changé).
+    Un 429 ou un 5xx (après les retries de fetch) fait échouer ce tick sans solliciter
+    davantage pathe.fr.
+    """
+    if not API_URL:
+        return await strategy_pages(client, sem, state, debug_info, render)
+
+    http_cache = state.setdefault("http_cache", {})
+    try:
+        r = await fetch(client, sem, API_URL, http_cache, ("api",), headers={"Accept": "application/json"})
+    except httpx.HTTPStatusError as e:
+        status = e.response.status_code
+        if status == 429:
+            # Rate limit au-delà de RETRY_MAX_WAIT: on abandonne ce tick, pas de pages en plus
+            log("⏳ API Pathé en 429, vérification reportée au prochain passage")
+            raise
+        if not 400 <= status < 500:
+            raise
+        log(f"⚠️ API Pathé en {e.response.status_code}, fallback pages HTML")
+        debug_info["used"].append(f"http:api:{e.response.status_code}")
+        return await strategy_pages(client, sem, state, debug_info, render)
+    debug_info["used"].append(f"http:api:{r.status_code}")
+
+    api_ok = cached_analysis(http_cache, API_URL, r, debug_info, ("api",))
+    if api_ok is not None:
+        return api_ok
+
+    try:
+        data = json_loads(r.content)
+    except ValueError as e:
+        log(f"⚠️ Réponse de l'API illisible ({e}), fallback pages HTML")
+        return await strategy_pages(client, sem, state, debug_info, render)
+
+    page_info = {}
+    api_ok = analyze_film_json(data, page_info)
+    store_analysis(http_cache, API_URL, r, api_ok, page_info, "api")
+    debug_info.update(page_info)
+    return api_ok
+
+
+async def strategy_cinema(client, sem, state, debug_info, render) -> bool:
+    """Page cinéma seule: film présent + horaires."""
+    return await check_cinema_page(client, sem, state, debug_info, render)
+
+
+async def strategy_film(client, sem, state, debug_info, render) -> bool:
+    """Page film seule: mot-clé cinéma + (signal de réservation OU horaires)."""
+    return await check_film_page(client, sem, state, debug_info)
+
+
+async def strategy_dom(client, sem, state, debug_info, render) -> bool:
+    """Rendu Playwright direct de la page cinéma (bloc du film), sans passer par HTTP."""
+    return await render_cinema_page(debug_info, state, debug_info)
 
-            browser.close()
 
-        html_n = normalize(html)
-        text_n = normalize(text)
+async def strategy_xhr(client, sem, state, debug_info, render) -> bool:
+    """Rendu Playwright de la page cinéma, lecture des réponses JSON (XHR) qu'elle charge."""
+    consent_cookies = valid_consent_cookies(state)
+    if consent_cookies:
+        debug_info["used"].append("consent_cookies")
+    hits = await capture_film_xhr(consent_cookies)
+    debug_info["used"].extend(f"xhr:{url}" for url, _ in hits)
+    debug_info["film_found_on_cinema_page"] = bool(hits)
+    debug_info["nb_horaires"] = hits[0][1] if hits else 0
+    return bool(hits)
 
-        # Détection film (pour être robuste, on utilise au moins le mot "avatar" ici)
-        # Quand tu passeras à Jana Nayagan, on mettra un mot-clé stable.
-        film_key = normalize(FILM_NAME)
-        # fallback ultra robuste: au moins "avatar" (pour ton test actuel)
-        fallback_keys = ["avatar", "feu", "cendres"]
 
-        film_found = (film_key in html_n) or (film_key in text_n) or any(k in html_n for k in fallback_keys) or any(k in text_n for k in fallback_keys)
-        debug_info["film_found"] = film_found
+STRATEGIES = {
+    "auto": strategy_auto,
+    "pages": strategy_pages,
+    "cinema": strategy_cinema,
+    "film": strategy_film,
+    "dom": strategy_dom,
+    "xhr": strategy_xhr,
+}
 
-        # Horaires HH:MM (dans HTML ou texte)
-        horaire_pattern = r"\b(?:[01]\d|2[0-3]):[0-5]\d\b"
-        times_html = re.findall(horaire_pattern, html_n)
-        times_text = re.findall(horaire_pattern, text_n)
 
-        # On combine (sans double compter)
-        all_times = list(dict.fromkeys(times_html + times_text))
-        debug_info["nb_horaires"] = len(all_times)
+async def check_availability(
+    client: httpx.AsyncClient, state: dict, mode: str = "auto", render: bool = False
+) -> tuple[bool, dict]:
+    """
+    Lance la stratégie `mode` (voir STRATEGIES). Les pages inchangées depuis
+    le dernier poll (state["http_cache"]) ne sont pas réanalysées.
+    """
+    debug_info = {
+        "film_found_on_cinema_page": False,
+        "cinema_found_on_film_page": False,
+        "reservation_signal": False,
+        "nb_horaires": 0,
+        "error": None,
+        "used": [f"mode:{mode}"],
+    }
 
-        available = film_found and debug_info["nb_horaires"] > 0
+    try:
+        sem = asyncio.Semaphore(HTTP_CONCURRENCY)
+        available = await STRATEGIES[mode](client, sem, state, debug_info, render)
 
-        log(f"🔎 film_found={film_found} | nb_horaires={debug_info['nb_horaires']} | available={available} | used={debug_info['used']}")
+        log(
+            f"🔎 film_found_on_cinema_page={debug_info['film_found_on_cinema_page']} "
+            f"| cinema_found_on_film_page={debug_info['cinema_found_on_film_page']} "
+            f"| reservation_signal={debug_info['reservation_signal']} "
+            f"| nb_horaires={debug_info['nb_horaires']} | available={available} | used={debug_info['used']}"
+        )
         return available, debug_info
 
-    except PlaywrightTimeoutError as e:
-        debug_info["error"] = f"Timeout Playwright: {e}"
+    except httpx.HTTPError as e:
+        debug_info["error"] = f"Erreur HTTP: {e}"
         log(f"❌ {debug_info['error']}")
         return False, debug_info
     except Exception as e:
-        debug_info["error"] = f"Erreur: {e}"
+        if is_playwright_timeout(e):
+            debug_info["error"] = f"Timeout Playwright: {e}"
+        else:
+            debug_info["error"] = f"Erreur: {e}"
         log(f"❌ {debug_info['error']}")
         return False, debug_info
 
 
-def send_email_brevo(subject: str, body: str) -> bool:
+def is_playwright_timeout(e: Exception) -> bool:
+    # Playwright n'est importé que si Chromium a servi: sinon ce ne peut pas être un de ses timeouts
+    pw = sys.modules.get("playwright.async_api")
+    return pw is not None and isinstance(e, pw.TimeoutError)
+
+
+class BrevoSender:
+    """
+    Connexion SMTP Brevo gardée ouverte pour tout un lot d'emails
+    (un seul STARTTLS + LOGIN), avec reconnexion si le serveur a coupé entre-temps.
+
+        with BrevoSender(user, key, from_email) as sender:
+            for subject, body in alerts:
+                sender.send(to_email, subject, body)
+    """
+
+    def __init__(self, smtp_user: str, smtp_pass: str, from_email: str):
+        self.smtp_user = smtp_user
+        self.smtp_pass = smtp_pass
+        self.from_email = from_email
+        self.server = None
+
+    def __enter__(self) -> "BrevoSender":
+        self._connect()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        import smtplib
+
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+    def _connect(self) -> None:
+        import smtplib
+
+        log("✉️ Connexion SMTP Brevo…")
+        self.server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        self.server.starttls()
+        self.server.login(self.smtp_user, self.smtp_pass)
+
+    def send(self, to_email: str, subject: str, body: str) -> None:
+        import smtplib
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg["From"] = self.from_email
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain", "utf-8"))
+
+        try:
+            self.server.sendmail(self.from_email, [to_email], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            log("⚠️ Connexion SMTP perdue, reconnexion…")
+            self._connect()
+            self.server.sendmail(self.from_email, [to_email], msg.as_string())
+        log(f"✅ Email envoyé à {to_email}")
+
+
+async def send_email_brevo_api(
+    client: httpx.AsyncClient, api_key: str, from_email: str, to_email: str, subject: str, body: str
+) -> None:
+    """
+    Envoi via l'API HTTP transactionnelle de Brevo: un POST JSON sur le client
+    partagé (connexion keep-alive réutilisée), sans STARTTLS + LOGIN SMTP.
+    """
+    r = await client.post(
+        BREVO_API_URL,
+        headers={"api-key": api_key},
+        json={
+            "sender": {"email": from_email},
+            "to": [{"email": to_email}],
+            "subject": subject,
+            "textContent": body,
+        },
+    )
+    r.raise_for_status()
+    log(f"✅ Email envoyé à {to_email} (API Brevo)")
+
+
+async def send_email_brevo(client: httpx.AsyncClient, subject: str, body: str) -> bool:
+    """Email d'alerte via l'API Brevo si BREVO_API_KEY est défini, sinon via SMTP."""
+    api_key = os.environ.get("BREVO_API_KEY")
     smtp_user = os.environ.get("BREVO_SMTP_USER")
     smtp_pass = os.environ.get("BREVO_SMTP_KEY")
     from_email = os.environ.get("BREVO_FROM_EMAIL")
     to_email = os.environ.get("ALERT_TO_EMAIL", "satheeshprashanth2002@gmail.com")
 
+    if api_key and from_email:
+        try:
+            await send_email_brevo_api(client, api_key, from_email, to_email, subject, body)
+            return True
+        except httpx.HTTPError as e:
+            log(f"❌ Erreur API Brevo: {e}")
+            if not (smtp_user and smtp_pass):
+                return False
+            log("↩️ Nouvel essai via SMTP")
+
     if not all([smtp_user, smtp_pass, from_email, to_email]):
         log("❌ Variables SMTP manquantes")
         return False
 
-    msg = MIMEMultipart()
-    msg["From"] = from_email
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body, "plain", "utf-8"))
-
     try:
-        log("✉️ Connexion SMTP Brevo…")
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(from_email, [to_email], msg.as_string())
-        log(f"✅ Email envoyé à {to_email}")
+        with BrevoSender(smtp_user, smtp_pass, from_email) as sender:
+            sender.send(to_email, subject, body)
         return True
     except Exception as e:
         log(f"❌ Erreur envoi email: {e}")
         return False
 
 
-def main():
+async def run_once(client: httpx.AsyncClient, args: argparse.Namespace) -> bool:
+    """Une vérification complète; renvoie True si un email d'alerte est parti."""
     log("===== START =====")
     state = read_state()
     last_status = state.get("last_status", "unavailable")
 
-    available, debug = check_availability()
+    available, debug = await check_availability(client, state, mode=args.mode, render=args.render)
     new_status = "available" if available else "unavailable"
 
     if new_status == "available" and last_status != "available":
@@ -241,20 +1270,137 @@ def main():
             f"URL cinéma: {CINEMA_URL}\n\n"
             f"Détails:\n"
             f"- film_found_on_cinema_page: {debug.get('film_found_on_cinema_page')}\n"
+            f"- cinema_found_on_film_page: {debug.get('cinema_found_on_film_page')}\n"
             f"- reservation_signal: {debug['reservation_signal']}\n"
             f"- nb_horaires: {debug['nb_horaires']}\n"
             f"- error: {debug.get('error')}\n\n"
             f"Date (UTC): {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}"
         )
-        send_email_brevo(subject, body)
+        email_sent = await send_email_brevo(client, subject, body)
     else:
         log("ℹ️ Pas de transition indispo->dispo")
+        email_sent = False
 
-    state["last_status"] = new_status
+    if debug.get("error"):
+        # Vérification en échec (429, 5xx, timeout...): statut inconnu, on garde le précédent
+        # pour ne pas renvoyer l'alerte au prochain succès
+        log(f"ℹ️ Statut inchangé ({last_status}) après l'erreur")
+    else:
+        state["last_status"] = new_status
     state["last_seen_at"] = datetime.now(timezone.utc).isoformat()
     write_state(state)
 
     log("===== END =====")
+    return email_sent
+
+
+async def poll_job(client: httpx.AsyncClient, args: argparse.Namespace) -> None:
+    """Job planifié du mode daemon: une vérification + compteurs METRICS."""
+    start = time.monotonic()
+    try:
+        if await run_once(client, args):
+            METRICS["email_sent_total"] += 1
+    finally:
+        METRICS["poll_count"] += 1
+        METRICS["poll_duration_seconds"] = round(time.monotonic() - start, 3)
+        await browser_pool.reap_idle()
+        log(f"📈 {METRICS}")
+
+
+async def run_daemon(client: httpx.AsyncClient, args: argparse.Namespace) -> None:
+    """
+    Planifie poll_job toutes les args.interval secondes avec APScheduler.
+    coalesce + max_instances=1: un tick en retard ou qui chevauche le précédent
+    est fusionné au lieu d'empiler des vérifications.
+    """
+    from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_MISSED
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    def on_job_event(event) -> None:
+        if event.code == EVENT_JOB_ERROR:
+            METRICS["poll_errors_total"] += 1
+            log(f"❌ Vérification en erreur: {event.exception}")
+        elif event.code == EVENT_JOB_MISSED:
+            METRICS["poll_missed_total"] += 1
+            log("⚠️ Tick manqué (vérification précédente trop longue)")
+
+    scheduler = AsyncIOScheduler(timezone=timezone.utc)
+    scheduler.add_listener(on_job_event, EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+    scheduler.add_job(
+        poll_job,
+        "interval",
+        seconds=args.interval,
+        args=[client, args],
+        coalesce=True,
+        max_instances=1,
+        next_run_time=datetime.now(timezone.utc),
+    )
+    scheduler.start()
+    log(f"🔁 Mode daemon: vérification toutes les {args.interval} s")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        scheduler.shutdown(wait=False)
+
+
+async def run(args: argparse.Namespace) -> None:
+    """
+    Une seule vérification (cron), ou vérifications planifiées en mode --daemon
+    qui réutilisent le même client HTTP et le même pool Chromium.
+    """
+    async with make_client() as client:
+        try:
+            if args.discover:
+                for url, n in await discover_api_urls():
+                    log(f"🧭 {n} horaire(s): {url}")
+                return
+
+            if not args.daemon:
+                await run_once(client, args)
+                return
+
+            await run_daemon(client, args)
+        finally:
+            await browser_pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Surveillance des séances Pathé")
+    parser.add_argument(
+        "--mode",
+        choices=sorted(STRATEGIES),
+        default=STRATEGY,
+        help=(
+            "Stratégie de détection (défaut: $PATHE_STRATEGY, sinon auto = API JSON si PATHE_API_URL, "
+            "sinon pages cinéma + film en HTTP)"
+        ),
+    )
+    parser.add_argument(
+        "--discover",
+        action="store_true",
+        help="Liste les endpoints JSON de pathe.fr qui renvoient des horaires (pour PATHE_API_URL), puis quitte",
+    )
+    parser.add_argument(
+        "--render",
+        action="store_true",
+        help="Fallback Playwright (Chromium) si le JSON __NEXT_DATA__ est absent ou sans séance du film",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Processus persistant: vérifie en boucle au lieu d'une seule fois",
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=POLL_INTERVAL,
+        help=f"Intervalle entre deux vérifications en mode --daemon (secondes, défaut: {POLL_INTERVAL})",
+    )
+    args = parser.parse_args()
+    if args.mode not in STRATEGIES:
+        parser.error(f"PATHE_STRATEGY invalide: {args.mode!r} (choix: {', '.join(sorted(STRATEGIES))})")
+
+    asyncio.run(run(args))
 
 
 if __name__ == "__main__":
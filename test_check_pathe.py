@@ -0,0 +1,73 @@
+"""
+Tests de walk_film_showtimes: ce parcours décide seul de l'alerte pour l'API JSON,
+__NEXT_DATA__ et les XHR capturées.
+
+    python -m pytest -q
+"""
+import pytest
+
+pytest.importorskip("httpx")
+
+from check_pathe import walk_film_showtimes  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        # Séances dans l'objet du film
+        ({"id": 11387, "showtimes": ["20:15"]}, {"20:15"}),
+        # Séances voisines de la référence au film
+        ({"film": {"id": 11387}, "showtimes": ["20:15"]}, {"20:15"}),
+        # Séances rangées sous l'id du film
+        ({"showtimes": {"11387": ["20:15"]}}, {"20:15"}),
+        # Séances (avec leur propre id) dans une liste de films
+        (
+            {
+                "films": [
+                    {"id": 11387, "sessions": [{"id": 99, "startsAt": "2025-12-18T20:15:00"}]},
+                    {"id": 5, "sessions": [{"id": 98, "startsAt": "2025-12-18T18:00:00"}]},
+                ]
+            },
+            {"2025-12-18T20:15:00"},
+        ),
+        # Liste de séances qui référencent chacune leur film
+        (
+            {
+                "showtimes": [
+                    {"filmId": 11387, "startsAt": "2025-12-18T20:15:00"},
+                    {"filmId": 5, "startsAt": "2025-12-18T18:00:00"},
+                ]
+            },
+            {"2025-12-18T20:15:00"},
+        ),
+        # Slug du film
+        ({"movie": {"slug": "avatar-de-feu-et-de-cendres-11387", "hours": ["14:30"]}}, {"14:30"}),
+    ],
+)
+def test_film_showtimes_found(data, expected):
+    assert walk_film_showtimes(data) == (True, expected)
+
+
+def test_other_film_nested_under_film_is_ignored():
+    data = {"filmId": 11387, "showtimes": ["20:15"], "related": [{"id": 5, "showtimes": ["18:00"]}]}
+    assert walk_film_showtimes(data) == (True, {"20:15"})
+
+
+def test_release_date_is_not_a_showtime():
+    data = {"id": 11387, "title": "Avatar…", "releaseAt": "2025-12-17T00:00:00", "shows": []}
+    assert walk_film_showtimes(data) == (True, set())
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        # "avatar" seul n'identifie pas le film (photo de profil)
+        {"user": {"avatar": "/img/avatar.png", "times": ["10:00"]}},
+        # Autre film
+        {"movie": {"slug": "autre-film-5", "hours": ["14:30"]}},
+        # Id voisin (pas 113870)
+        {"id": 113870, "showtimes": ["20:15"]},
+    ],
+)
+def test_not_the_film(data):
+    assert walk_film_showtimes(data) == (False, set())